@@ -10,6 +10,7 @@ Snapshot manager plugin helpers.
 """
 import os
 from os.path import sep as path_sep, ismount
+import re
 from abc import ABC, abstractmethod
 import logging
 
@@ -37,6 +38,27 @@ DMSETUP_REPORT_SEP = ":"
 # Fields: origin_name-snapset_snapset-name_timestamp_mount-point
 SNAPSHOT_NAME_FORMAT = "%s-snapset_%s_%d_%s"
 
+# Snapshot name fields following the origin name and separator
+_SNAPSHOT_NAME_REGEX = re.compile(r"snapset_([^_]*)_(\d+)_(.*)", re.DOTALL)
+
+# Mount point characters that must be escaped in snapshot names: '.' is
+# escaped as '..' and characters outside the valid set as '.<hex>'.
+_ESCAPE_CHARS_REGEX = re.compile(
+    "[^"
+    + "".join(re.escape(char) for char in sorted(SNAPM_VALID_NAME_CHARS - {"."}))
+    + re.escape(path_sep)
+    + "]"
+)
+
+# Escape sequences in encoded mount point names
+_UNESCAPE_CHARS_REGEX = re.compile(r"\.(\.|.{0,2})", re.DOTALL)
+
+# Mount point path separator encoding: '-' is escaped as '--' and the
+# path separator is replaced with '-'.
+_MOUNT_SEPARATOR_TRANSLATION = str.maketrans(
+    {_MOUNT_SEPARATOR: _ESCAPED_MOUNT_SEPARATOR, path_sep: _MOUNT_SEPARATOR}
+)
+
 #: Plugin configuration Limits section
 _PLUGIN_CFG_LIMITS = "Limits"
 
@@ -348,6 +370,16 @@ class Plugin(ABC):
         """
 
 
+def _escape_char(match):
+    """
+    Return the escaped form of the single character matched by ``match``.
+    """
+    char = match.group(0)
+    if char == ".":
+        return ".."
+    return "." + char.encode("utf8").hex()
+
+
 def _escape_bad_chars(path):
     """
     Encode illegal characters in mount point path.
@@ -355,16 +387,19 @@ def _escape_bad_chars(path):
     :param path: The path to escape.
     :returns: The escaped path.
     """
-    escaped = ""
-    for char in path:
-        if char != path_sep and char not in SNAPM_VALID_NAME_CHARS:
-            escaped = escaped + "." + char.encode("utf8").hex()
-        else:
-            if char == ".":
-                escaped = escaped + ".."
-            else:
-                escaped = escaped + char
-    return escaped
+    return _ESCAPE_CHARS_REGEX.sub(_escape_char, path)
+
+
+def _unescape_char(match):
+    """
+    Return the character encoded by the escape sequence matched by ``match``.
+    """
+    escaped = match.group(1)
+    if escaped == ".":
+        return "."
+    if not escaped:
+        raise ValueError("Truncated escape sequence in mount point path")
+    return bytearray.fromhex(escaped).decode("utf8")
 
 
 def _unescape_bad_chars(path):
@@ -374,24 +409,7 @@ def _unescape_bad_chars(path):
     :param path: The path to unescape.
     :returns: The unescaped path.
     """
-
-    def decode_byte(byte):
-        return bytearray.fromhex(byte).decode("utf8")
-
-    unescaped = ""
-    i = 0
-    while i < len(path):
-        if path[i] == ".":
-            if path[i + 1] == ".":
-                unescaped = unescaped + "."
-                i += 1
-            else:
-                unescaped = unescaped + decode_byte(path[i + 1 : i + 3])
-                i += 2
-        else:
-            unescaped = unescaped + path[i]
-        i += 1
-    return unescaped
+    return _UNESCAPE_CHARS_REGEX.sub(_unescape_char, path)
 
 
 def encode_mount_point(mount_point):
@@ -401,14 +419,7 @@ def encode_mount_point(mount_point):
     Encode a mount point for use in a snapshot name by replacing the path
     separator with '-'.
     """
-    if mount_point == "/":
-        return _MOUNT_SEPARATOR
-    mount_point = _escape_bad_chars(mount_point)
-    parts = [
-        part.replace(_MOUNT_SEPARATOR, _ESCAPED_MOUNT_SEPARATOR)
-        for part in mount_point.split(path_sep)
-    ]
-    return _MOUNT_SEPARATOR.join(parts)
+    return _escape_bad_chars(mount_point).translate(_MOUNT_SEPARATOR_TRANSLATION)
 
 
 def _split_mount_separators(mount_str):
@@ -454,23 +465,22 @@ def parse_snapshot_name(full_name, origin):
     Attempt to parse a snapshot set snapshot name.
 
     Returns a tuple of (snapset_name, timestamp, mount_point) if ``full_name``
-    is a valid snapset snapshot name, or ``None`` otherwise.
+    is a valid snapset snapshot name, or ``None`` otherwise (including names
+    with a malformed timestamp or mount point encoding).
     """
     if not full_name.startswith(origin):
         return None
     base = full_name.removeprefix(origin + "-")
-    if "_" not in base:
-        return None
-    fields = base.split("_", maxsplit=3)
-    if len(fields) != 4:
+    match = _SNAPSHOT_NAME_REGEX.fullmatch(base)
+    if not match:
         return None
-    if fields[0] != "snapset":
+    (snapset_name, timestamp, mount_str) = match.groups()
+    try:
+        mount_point = decode_mount_point(mount_str)
+    except ValueError:
         return None
-    snapset_name = fields[1]
-    timestamp = int(fields[2])
-    mount_point = decode_mount_point(fields[3])
     # (snapset_name, timestamp, mount)
-    return (snapset_name, timestamp, mount_point)
+    return (snapset_name, int(timestamp), mount_point)
 
 
 def _parse_proc_mounts_line(mount_line):
@@ -8,14 +8,14 @@
 """
 LVM2 snapshot manager plugins
 """
-from os.path import exists as path_exists, join as path_join, isabs as path_isabs
+from os.path import isabs as path_isabs
 from os import stat, major as dev_major, environ
-from subprocess import run, CalledProcessError
+from subprocess import run, CalledProcessError, DEVNULL, PIPE
 from json import loads, JSONDecodeError
-from math import floor
 from stat import S_ISBLK
-from time import time
+from time import monotonic
 from shutil import which
+import re
 
 from snapm import (
     SnapmInvalidIdentifierError,
@@ -48,18 +48,33 @@ from snapm.manager.plugins import (
     encode_mount_point,
 )
 
+#: Device directory prefix for LVM2 device paths
+_DEV_PREFIX_DIR = DEV_PREFIX + "/"
+
 #: Maximum length for LVM2 LV names
 LVM_MAX_NAME_LEN = 127
 #: Length of extension for LVM2 CoW snapshot LV name
 LVM_COW_SNAPSHOT_NAME_LEN = 4
 
+#: Valid LVM2 LV name: allowed characters only, no leading hyphen.
+_LVM_NAME_REGEX = re.compile(r"[a-zA-Z0-9+_.][a-zA-Z0-9+_.-]*")
+
+#: LVM2 LV name prefixes and substrings reserved for internal use.
+_LVM_RESERVED_NAME_REGEX = re.compile(
+    r"^(?:snapshot|pvmove)"
+    r"|_(?:cdata|cmeta|corig|cpool|cvol|imeta|iorig|mimage|mlog|pmspare"
+    r"|rimage|rmeta|tdata|tmeta|vdata|vdo|vorigin|wcorig)"
+)
+
 # Global LVM2 report options
 LVM_REPORT_FORMAT = "--reportformat"
 LVM_JSON = "json"
 LVM_JSON_STD = "json_std"
+LVM_BASIC = "basic"
 LVM_OPTIONS = "--options"
 LVM_UNITS = "--units"
 LVM_BYTES = "b"
+LVM_BYTES_SUFFIX = "B"
 LVM_UUID_PREFIX = "LVM-"
 
 # Main lvm executable
@@ -71,6 +86,11 @@ LVM_VERSION = "version"
 # LVM version string prefix
 LVM_VERSION_STR = "LVM version"
 
+# Match the LVM2 version number in the output of "lvm version"
+_LVM_VERSION_REGEX = re.compile(
+    re.escape(LVM_VERSION_STR.encode("utf8")) + rb":\s+(\d+)\.(\d+)\.(\d+)"
+)
+
 # lvs report options
 LVS_CMD = "lvs"
 LVS_REPORT = "report"
@@ -94,6 +114,12 @@ LVS_FIELD_OPTIONS = (
 LVS_FIELD_MIN_OPTIONS = "vg_name,lv_name"
 LVS_NO_HEADINGS = "--noheadings"
 
+# lvs options for plain vg/lv name reports
+LVM_CONFIG = "--config"
+LVS_NO_PREFIXES = "report/prefixes=0"
+LVS_SEPARATOR = "--separator"
+LVS_FIELD_SEPARATOR = "/"
+
 
 # lv_attr flag values
 LVM_COW_SNAP_ATTR = "s"
@@ -106,10 +132,20 @@ LVM_LV_TYPE_DEFAULT = "-"
 LVM_LV_ORIGIN_MERGING = "O"
 LVM_SKIP_ACTIVATION_ATTR = "k"
 
+# lv_attr volume types for CoW and thin snapshots, including merging snapshots
+_LVM_COW_SNAP_TYPES = (LVM_COW_SNAP_ATTR, LVM_MERGE_SNAP_ATTR)
+_LVM_THIN_SNAP_TYPES = (LVM_THIN_VOL_ATTR, LVM_MERGE_SNAP_ATTR)
+
 # lv_attr flag indexes
 LVM_LV_STATE_ATTR_IDX = 4
 LVM_LV_SKIP_ACTIVATION_IDX = 9
 
+# Snapshot status for lv_attr state values: other states are inactive.
+_LVM_LV_STATE_MAP = {
+    LVM_INVALID_ATTR: SnapStatus.INVALID,
+    LVM_ACTIVE_ATTR: SnapStatus.ACTIVE,
+}
+
 # lv_role strings
 LVM_COW_SNAPSHOT_ROLE = "thicksnapshot"
 LVM_THIN_SNAPSHOT_ROLE = "thinsnapshot"
@@ -126,10 +162,16 @@ LVCREATE_SNAPSHOT = "--snapshot"
 LVCREATE_NAME = "--name"
 LVCREATE_SIZE = "--size"
 
+# Common lvcreate argument prefix for snapshot creation
+_LVCREATE_SNAPSHOT_ARGS = (LVCREATE_CMD, LVCREATE_SNAPSHOT, LVCREATE_NAME)
+
 # lvremove command options
 LVREMOVE_CMD = "lvremove"
 LVREMOVE_YES = "--yes"
 
+# Common lvremove argument prefix
+_LVREMOVE_ARGS = (LVREMOVE_CMD, LVREMOVE_YES)
+
 # lvrename command
 LVRENAME_CMD = "lvrename"
 
@@ -146,6 +188,15 @@ LVCHANGE_SETACTIVATIONSKIP = "--setactivationskip"
 LVCHANGE_ACTIVATIONSKIP_YES = "y"
 LVCHANGE_ACTIVATIONSKIP_NO = "n"
 
+# Common lvchange argument prefixes for activation and activation skip
+_LVCHANGE_ACTIVATE_ARGS = (
+    LVCHANGE_CMD,
+    LVCHANGE_YES,
+    LVCHANGE_IGNOREACTIVATIONSKIP,
+    LVCHANGE_ACTIVATE,
+)
+_LVCHANGE_SETACTIVATIONSKIP_ARGS = (LVCHANGE_CMD, LVCHANGE_SETACTIVATIONSKIP)
+
 # lvconvert command
 LVCONVERT_CMD = "lvconvert"
 
@@ -155,6 +206,9 @@ LVCONVERT_MERGE = "--merge"
 # lvresize command
 LVRESIZE_CMD = "lvresize"
 
+# Common lvresize argument prefix
+_LVRESIZE_ARGS = (LVRESIZE_CMD, LVCREATE_SIZE)
+
 # Minimum possible LVM2 CoW snapshot size (512MiB)
 MIN_LVM2_COW_SNAPSHOT_SIZE = 512 * 1024**2
 
@@ -184,28 +238,41 @@ LVM2_COW_STATIC_PRIORITY = 10
 LVM2_THIN_STATIC_PRIORITY = 15
 
 # LVM2 environment variables to filter out
-_LVM_ENV_FILTER = [
-    "LVM_OUT_FD",
-    "LVM_ERR_FD",
-    "LVM_REPORT_FD",
-    "LVM_COMMAND_PROFILE",
-    "LVM_RUN_BY_DMEVENTD",
-    "LVM_SUPPRESS_FD_WARNINGS",
-    "LVM_SUPPRESS_SYSLOG",
-    "LVM_VG_NAME",
-    "LVM_LVMPOLLD_PIDFILE",
-    "LVM_LVMPOLLD_SOCKET",
-    "LVM_LOG_FILE_EPOCH",
-    "LVM_LOG_FILE_MAX_LINES",
-    "LVM_EXPECTED_EXIT_STATUS",
-    "LVM_SUPPRESS_LOCKING_FAILURE_MESSAGES",
-    "DM_ABORT_ON_INTERNAL_ERRORS",
-    "DM_DISABLE_UDEV",
-    "DM_DEBUG_WITH_LINE_NUMBERS",
-]
+_LVM_ENV_FILTER = frozenset(
+    [
+        "LVM_OUT_FD",
+        "LVM_ERR_FD",
+        "LVM_REPORT_FD",
+        "LVM_COMMAND_PROFILE",
+        "LVM_RUN_BY_DMEVENTD",
+        "LVM_SUPPRESS_FD_WARNINGS",
+        "LVM_SUPPRESS_SYSLOG",
+        "LVM_VG_NAME",
+        "LVM_LVMPOLLD_PIDFILE",
+        "LVM_LVMPOLLD_SOCKET",
+        "LVM_LOG_FILE_EPOCH",
+        "LVM_LOG_FILE_MAX_LINES",
+        "LVM_EXPECTED_EXIT_STATUS",
+        "LVM_SUPPRESS_LOCKING_FAILURE_MESSAGES",
+        "DM_ABORT_ON_INTERNAL_ERRORS",
+        "DM_DISABLE_UDEV",
+        "DM_DEBUG_WITH_LINE_NUMBERS",
+    ]
+)
 
 _dm_major: int = 0
 
+#: Match the device-mapper entry in the block section of ``/proc/devices``.
+_DM_MAJOR_REGEX = re.compile(
+    rb"^[ \t]*(\d+)[ \t]+device-mapper[ \t]*$", re.MULTILINE
+)
+
+#: Resolved LVM2 command paths, keyed by the ``PATH`` used to find them.
+_lvm_cmd_paths: dict = {}
+
+#: Installed LVM2 versions, keyed by the path to the ``lvm`` command.
+_lvm_versions: dict = {}
+
 
 def _get_dm_major() -> int:
     """
@@ -220,32 +287,18 @@ def _get_dm_major() -> int:
     if _dm_major:
         return _dm_major
 
-    major: int = 0
     try:
-        with open("/proc/devices", "r", encoding="utf8") as fp:
-            in_block = False
-            for raw in fp:
-                line = raw.strip()
-                if line.startswith("Block devices:"):
-                    in_block = True
-                    continue
-                if not in_block or not line:
-                    continue
-                parts = line.split(maxsplit=1)
-                if len(parts) != 2:
-                    continue
-                major_str, name = parts
-                if name.strip() == "device-mapper":
-                    try:
-                        major = int(major_str)
-                    except ValueError:
-                        return 0
-                    if major:
-                        _dm_major = major
-                        return _dm_major
+        with open("/proc/devices", "rb") as fp:
+            devices = fp.read()
     except OSError:
         return 0
-    return 0
+
+    # Only search the block device section of /proc/devices.
+    _, _, block_devices = devices.partition(b"Block devices:\n")
+    match = _DM_MAJOR_REGEX.search(block_devices)
+    if match:
+        _dm_major = int(match.group(1))
+    return _dm_major
 
 
 def _round_up_extents(size_bytes: int, extent_size: int) -> int:
@@ -256,15 +309,39 @@ def _round_up_extents(size_bytes: int, extent_size: int) -> int:
     :param extent_size: An extent size.
     :returns: The given size rounded up to the next extent size boundary.
     """
-    if not extent_size or extent_size < 0 or not isinstance(extent_size, int):
+    if not isinstance(extent_size, int) or extent_size <= 0:
         raise ValueError("extent_size must be a positive integer")
 
-    if size_bytes < 0 or not isinstance(size_bytes, int):
+    if not isinstance(size_bytes, int) or size_bytes < 0:
         raise ValueError("size_bytes must be a non-negative integer")
 
     return ((size_bytes + extent_size - 1) // extent_size) * extent_size
 
 
+def _parse_size(value):
+    """
+    Parse an LVM2 report size value in bytes with an optional ``B`` unit
+    suffix.
+
+    :param value: A size string reported with ``--units b``.
+    :returns: The size in bytes as an int.
+    """
+    return int(value[:-1]) if value.endswith(LVM_BYTES_SUFFIX) else int(value)
+
+
+def _parse_percent(value):
+    """
+    Parse an LVM2 report percentage into an exact integer ratio.
+
+    :param value: A percentage as reported by LVM2, for example ``"13.02"``
+                  or ``13.02``.
+    :returns: A 2-tuple ``(used, scale)`` where ``used / scale`` is the
+              reported fraction.
+    """
+    whole, _, frac = str(value).partition(".")
+    return (int(whole + frac), 100 * 10 ** len(frac))
+
+
 def _decode_stderr(err):
     """
     Decode and strip the stderr member of a ``CalledProcessError`` and
@@ -272,9 +349,27 @@ def _decode_stderr(err):
 
     :param err: A ``CalledProcessError`` like exception.
     :returns: A stripped string representation of the exception's stderr
-              member.
+              member, or of the exception itself if stderr was not
+              captured.
     """
-    return err.stderr.decode("utf8").strip()
+    if not err.stderr:
+        return str(err)
+    return err.stderr.decode("utf8", errors="replace").strip()
+
+
+def _decode_json_report(cmd, stdout):
+    """
+    Decode the JSON report output of an LVM2 reporting command.
+
+    :param cmd: The name of the command that produced the report.
+    :param stdout: The raw ``bytes`` output of the command.
+    :returns: The decoded report dictionary.
+    :raises: ``SnapmCalloutError`` if the output is not valid JSON.
+    """
+    try:
+        return loads(stdout)
+    except JSONDecodeError as err:
+        raise SnapmCalloutError(f"Unable to decode {cmd} JSON output: {err}") from err
 
 
 def _check_lvm_present():
@@ -282,21 +377,33 @@ def _check_lvm_present():
     Check for the presence of the required LVM2 commands and device-mapper
     support.
 
+    The command paths found for a given ``PATH`` value are cached for the
+    lifetime of the process.
+
+    :returns: A dictionary mapping each required command name to its
+              absolute path.
     :raises: ``SnapmNotFoundError`` if required dependencies are not found.
     """
-    if not all(which(cmd) for cmd in _LVM_CMDS):
-        raise SnapmNotFoundError("LVM2 commands not found")
+    search_path = environ.get("PATH")
+    cmd_paths = _lvm_cmd_paths.get(search_path)
+    if cmd_paths is None:
+        cmd_paths = {cmd: which(cmd, path=search_path) for cmd in _LVM_CMDS}
+        if not all(cmd_paths.values()):
+            raise SnapmNotFoundError("LVM2 commands not found")
+        _lvm_cmd_paths[search_path] = cmd_paths
 
     if not _get_dm_major():
         raise SnapmNotFoundError("device-mapper not found")
 
+    return cmd_paths
+
 
 def vg_lv_from_origin(origin):
     """
     Return a ``(vg_name, lv_name)`` tuple for the LVM device with origin
     path ``origin``.
     """
-    name_parts = origin.removeprefix(DEV_PREFIX + "/").split("/")
+    name_parts = origin.removeprefix(_DEV_PREFIX_DIR).split("/", 2)
     return (name_parts[0], name_parts[1])
 
 
@@ -321,14 +428,11 @@ class Lvm2Snapshot(Snapshot):
         super().__init__(name, snapset_name, origin, timestamp, mount_point, provider)
         self.vg_name = vg_name
         self.lv_name = lv_name
+        # The origin path is fixed for the lifetime of the snapshot.
+        self._origin_path = f"{DEV_PREFIX}/{vg_name}/{origin}"
         if lv_dict:
-            self._lv_dict_cache = lv_dict
-        else:
-            lvs_dict = self.provider.get_lvs_json_report(
-                f"{self.vg_name}/{self.lv_name}"
-            )
-            self._lv_dict_cache = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        self._lv_dict_cache_ts = time()
+            # pylint: disable=protected-access
+            provider._cache_lv_dict(vg_name, lv_name, lv_dict)
 
     def __str__(self):
         return "".join(
@@ -341,7 +445,7 @@ class Lvm2Snapshot(Snapshot):
 
     @property
     def origin(self):
-        return path_join(DEV_PREFIX, self.vg_name, self._origin)
+        return self._origin_path
 
     @property
     def origin_options(self):
@@ -354,7 +458,7 @@ class Lvm2Snapshot(Snapshot):
         return ""
 
     def _devpath(self):
-        return path_join(DEV_PREFIX, self.vg_name, self.lv_name)
+        return f"{DEV_PREFIX}/{self.vg_name}/{self.lv_name}"
 
     @property
     def devpath(self):
@@ -366,18 +470,15 @@ class Lvm2Snapshot(Snapshot):
     def status(self):
         lv_dict = self._get_lv_dict_cache()
         lv_attr = lv_dict[LVS_LV_ATTR]
-        if lv_attr[LVM_LV_STATE_ATTR_IDX] == LVM_INVALID_ATTR:
-            return SnapStatus.INVALID
-        if lv_attr.startswith(LVM_MERGE_SNAP_ATTR):
+        lv_state = lv_attr[LVM_LV_STATE_ATTR_IDX]
+        if lv_state != LVM_INVALID_ATTR and lv_attr[0] == LVM_MERGE_SNAP_ATTR:
             return SnapStatus.REVERTING
-        if lv_attr[LVM_LV_STATE_ATTR_IDX] == LVM_ACTIVE_ATTR:
-            return SnapStatus.ACTIVE
-        return SnapStatus.INACTIVE
+        return _LVM_LV_STATE_MAP.get(lv_state, SnapStatus.INACTIVE)
 
     @property
     def size(self):
         lv_dict = self._get_lv_dict_cache()
-        return int(lv_dict[LVS_LV_SIZE].rstrip("B"))
+        return _parse_size(lv_dict[LVS_LV_SIZE])
 
     @property
     def free(self):
@@ -389,23 +490,15 @@ class Lvm2Snapshot(Snapshot):
     def autoactivate(self):
         lv_dict = self._get_lv_dict_cache()
         lv_attr = lv_dict[LVS_LV_ATTR]
-        if lv_attr[LVM_LV_SKIP_ACTIVATION_IDX] == LVM_SKIP_ACTIVATION_ATTR:
-            return False
-        return True
+        return lv_attr[LVM_LV_SKIP_ACTIVATION_IDX] != LVM_SKIP_ACTIVATION_ATTR
 
     def invalidate_cache(self):
-        self._lv_dict_cache = None
-        self._lv_dict_cache_ts = 0
+        # pylint: disable=protected-access
+        self.provider._invalidate_lv_dict(self.vg_name, self.lv_name)
 
     def _get_lv_dict_cache(self):
-        now = time()
-        if not self._lv_dict_cache or (self._lv_dict_cache_ts + LVS_CACHE_VALID) < now:
-            lvs_dict = self.provider.get_lvs_json_report(
-                f"{self.vg_name}/{self.lv_name}"
-            )
-            self._lv_dict_cache = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-            self._lv_dict_cache_ts = now
-        return self._lv_dict_cache
+        # pylint: disable=protected-access
+        return self.provider._get_lv_dict(self.vg_name, self.lv_name)
 
 
 class Lvm2CowSnapshot(Lvm2Snapshot):
@@ -416,8 +509,8 @@ class Lvm2CowSnapshot(Lvm2Snapshot):
     @property
     def free(self):
         lv_dict = self._get_lv_dict_cache()
-        lv_data_percent = float(lv_dict[LVS_DATA_PERCENT])
-        return int(((100.0 - lv_data_percent) * self.size) / 100.0)
+        used, scale = _parse_percent(lv_dict[LVS_DATA_PERCENT])
+        return (_parse_size(lv_dict[LVS_LV_SIZE]) * (scale - used)) // scale
 
 
 class Lvm2ThinSnapshot(Lvm2Snapshot):
@@ -439,19 +532,6 @@ class Lvm2ThinSnapshot(Lvm2Snapshot):
         return self.provider.pool_free_space(self.vg_name, lv_dict[LVS_POOL_LV])
 
 
-def _volume_type_or_merging(lv_dict, lv_type):
-    """
-    Return ``True`` if the logical volume represented by ``lv_dict`` is either
-    the specified ``lv_type``, or a merging snapshot volume, or ``False``
-    otherwise.
-    """
-    if lv_dict[LVS_LV_ATTR].startswith(lv_type):
-        return True
-    if lv_dict[LVS_LV_ATTR].startswith(LVM_MERGE_SNAP_ATTR):
-        return True
-    return False
-
-
 def filter_cow_snapshot(lv_dict):
     """
     Filter LVM2 CoW snapshots.
@@ -460,13 +540,12 @@ def filter_cow_snapshot(lv_dict):
     COW snapshot or ``False`` otherwise. The ``lv_dict`` argument must be a
     dictionary representing the output of the ``lvs`` reporting command.
     """
-    if not _volume_type_or_merging(lv_dict, LVM_COW_SNAP_ATTR):
+    # Reject the common non-snapshot case on the volume type alone.
+    if lv_dict[LVS_LV_ATTR][:1] not in _LVM_COW_SNAP_TYPES:
         return False
-    if LVM_COW_SNAPSHOT_ROLE not in lv_dict[LVS_LV_ROLE]:
+    if not lv_dict[LVS_LV_ORIGIN]:
         return False
-    if lv_dict[LVS_LV_ORIGIN] == "":
-        return False
-    return True
+    return LVM_COW_SNAPSHOT_ROLE in lv_dict[LVS_LV_ROLE]
 
 
 def filter_thin_snapshot(lv_dict):
@@ -477,15 +556,15 @@ def filter_thin_snapshot(lv_dict):
     thin snapshot or ``False`` otherwise. The ``lv_dict`` argument must be a
     dictionary representing the output of the ``lvs`` reporting command.
     """
-    if not _volume_type_or_merging(lv_dict, LVM_THIN_VOL_ATTR):
-        return False
-    if LVM_THIN_SNAPSHOT_ROLE not in lv_dict[LVS_LV_ROLE]:
+    # Reject the common non-snapshot case on the volume type alone.
+    if lv_dict[LVS_LV_ATTR][:1] not in _LVM_THIN_SNAP_TYPES:
         return False
-    if lv_dict[LVS_LV_ORIGIN] == "":
+    if not lv_dict[LVS_LV_ORIGIN]:
         return False
-    return True
+    return LVM_THIN_SNAPSHOT_ROLE in lv_dict[LVS_LV_ROLE]
 
 
+# pylint: disable=too-many-public-methods
 class _Lvm2(Plugin):
     """
     Abstract base class for LVM2 snapshot plugins.
@@ -516,9 +595,16 @@ class _Lvm2(Plugin):
         caller's ``env`` value is merged with the dictionary passed to the
         underlying ``run()`` call, potentially overriding the values contained
         in ``self._env``.
+
+        The command name in the first argument is replaced with the absolute
+        path resolved when the plugin was initialised to avoid a ``PATH``
+        search for each callout.
         """
         kwargs["env"] = self._env | kwargs["env"] if "env" in kwargs else self._env
+        cmd_args, *popenargs = popenargs
+        cmd_args = [self._cmd_paths.get(cmd_args[0], cmd_args[0]), *cmd_args[1:]]
         return run(
+            cmd_args,
             *popenargs,
             input=input,
             capture_output=capture_output,
@@ -527,33 +613,53 @@ class _Lvm2(Plugin):
             **kwargs,
         )
 
+    def _run_lvm_change(self, cmd_args):
+        """
+        Run the LVM2 command ``cmd_args`` that modifies logical volume state.
+
+        The logical volume cache is invalidated before the command runs. The
+        command's output is discarded and its error output is only read to
+        report a failure.
+
+        :param cmd_args: The command and its arguments.
+        :raises: ``SnapmCalloutError`` if the command fails.
+        """
+        self._invalidate_lvs_cache()
+        try:
+            self._run(cmd_args, stdout=DEVNULL, stderr=PIPE, check=True)
+        except CalledProcessError as err:
+            raise SnapmCalloutError(
+                f"{cmd_args[0]} failed with: {_decode_stderr(err)}"
+            ) from err
+
     def _is_lvm_device(self, device):
         """
         Test whether ``device`` is an LVM device.
 
         Return ``True`` if the device at ``device`` is an LVM device or
-        ``False`` otherwise.
+        ``False`` otherwise. Results are cached for each device path and
+        device number: a device that is re-created with a new device
+        number is checked again. The cache is discarded whenever the plugin
+        runs a modifying LVM2 command, since removing and creating logical
+        volumes can reuse device-mapper minor numbers.
         """
-
-        def _check_dm_major(dev):
-            st = stat(dev, follow_symlinks=True)
-            if not S_ISBLK(st.st_mode):
-                return False
-            if dev_major(st.st_rdev) != _get_dm_major():
-                return False
-            return True
-
         if path_isabs(device):
-            if not path_exists(device):
-                return False
-            if not _check_dm_major(device):
-                return False
+            check_path = device
         else:
-            check_path = path_join(DEV_MAPPER_PREFIX, device)
-            if not path_exists(check_path):
-                return False
-            if not _check_dm_major(check_path):
-                return False
+            check_path = DEV_MAPPER_PREFIX + device
+
+        try:
+            st = stat(check_path, follow_symlinks=True)
+        except OSError:
+            return False
+        if not S_ISBLK(st.st_mode):
+            return False
+        if dev_major(st.st_rdev) != _get_dm_major():
+            return False
+
+        cache_key = (device, st.st_rdev)
+        if cache_key in self._lvm_devices:
+            return self._lvm_devices[cache_key]
 
         if device.startswith(DEV_MAPPER_PREFIX):
             dm_name = device.removeprefix(DEV_MAPPER_PREFIX)
@@ -575,7 +681,9 @@ class _Lvm2(Plugin):
                 f"Error calling {DMSETUP_CMD}: {_decode_stderr(err)}"
             ) from err
         uuid = dmsetup_cmd.stdout.decode("utf8").strip()
-        return uuid.startswith(LVM_UUID_PREFIX)
+        is_lvm = uuid.startswith(LVM_UUID_PREFIX)
+        self._lvm_devices[cache_key] = is_lvm
+        return is_lvm
 
     def _get_lvm_version(self):
         """
@@ -584,30 +692,38 @@ class _Lvm2(Plugin):
         :returns: A version tuple (major, minor, patch) of LVM2
         """
 
-        def _version_string_to_tuple(version):
-            return tuple(map(int, version.split(".")))
-
         lvm_cmd_args = [LVM_CMD, LVM_VERSION]
         lvm_cmd = self._run(lvm_cmd_args, capture_output=True, check=True)
-        lvm_version_info = str.strip(lvm_cmd.stdout.decode("utf8"))
-        for line in lvm_version_info.splitlines():
-            if LVM_VERSION_STR in line:
-                (_, _, version, _) = line.split()
-                if "(" in version:
-                    version, _ = version.split("(", maxsplit=1)
-                return _version_string_to_tuple(version)
-        return (0, 0, 0)
+        match = _LVM_VERSION_REGEX.search(lvm_cmd.stdout)
+        if not match:
+            return (0, 0, 0)
+        return tuple(int(part) for part in match.groups())
 
-    def vg_lv_from_device_path(self, devpath):
+    def _get_vg_lv_names(self, devpath):
         """
-        Return a ``(vg_name, lv_name)`` tuple for the LVM device at
-        ``devpath``.
+        Call out to the ``lvs`` program and return the ``(vg_name, lv_name)``
+        pair for the LVM device at ``devpath``.
+
+        The report is requested in plain, unaligned format: this avoids the
+        JSON report framing for a lookup that only needs the two names. The
+        basic report format and unprefixed field values are requested
+        explicitly so that the output does not depend on the ``report``
+        settings in the host's ``lvm.conf``.
+
+        :param devpath: The path to an LVM2 logical volume device.
+        :returns: A 2-tuple ``(vg_name, lv_name)``.
+        :raises: ``SnapmCalloutError`` if the ``lvs`` call fails or returns
+                 unexpected output.
         """
         lvs_cmd_args = [
             LVS_CMD,
             LVS_NO_HEADINGS,
             LVM_REPORT_FORMAT,
-            self._json_fmt,
+            LVM_BASIC,
+            LVM_CONFIG,
+            LVS_NO_PREFIXES,
+            LVS_SEPARATOR,
+            LVS_FIELD_SEPARATOR,
             LVM_OPTIONS,
             LVS_FIELD_MIN_OPTIONS,
             devpath,
@@ -618,32 +734,72 @@ class _Lvm2(Plugin):
             raise SnapmCalloutError(
                 f"Error calling {LVS_CMD}: {_decode_stderr(err)}"
             ) from err
-        lvs_dict = loads(lvs_cmd.stdout)
-        lv_dict = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        return (lv_dict["vg_name"], lv_dict["lv_name"])
+        values = lvs_cmd.stdout.decode("utf8").strip().split(LVS_FIELD_SEPARATOR)
+        if len(values) != 2:
+            raise SnapmCalloutError(
+                f"Unexpected {LVS_CMD} output for {devpath}: {lvs_cmd.stdout!r}"
+            )
+        return (values[0], values[1])
+
+    def vg_lv_from_device_path(self, devpath):
+        """
+        Return a ``(vg_name, lv_name)`` tuple for the LVM device at
+        ``devpath``.
+
+        Results are cached with the plugin's logical volume cache and
+        discarded whenever it is refreshed or invalidated.
+        """
+        if self._lvs_cache_valid() and devpath in self._device_vg_lv:
+            return self._device_vg_lv[devpath]
+        vg_name, lv_name = self._get_vg_lv_names(devpath)
+        self._device_vg_lv[devpath] = (vg_name, lv_name)
+        return (vg_name, lv_name)
 
     def pool_name_from_vg_lv(self, vg_lv):
         """
         Return the thin pool associated with the logical volume identified by
-        ``vg_lv``.
+        ``vg_lv``: either a ``vg_name/lv_name`` string or an LVM2 device path.
+
+        Device paths, including ``/dev/mapper`` names, are resolved with
+        ``lvs`` before the cached report for the volume is consulted.
+
+        :param vg_lv: A ``vg_name/lv_name`` string or LVM2 device path.
+        :returns: The thin pool name, or the empty string if the logical
+                  volume is not thinly provisioned.
+        :raises: ``SnapmPluginError`` if ``vg_lv`` is not a valid
+                 ``vg_name/lv_name`` string or device path.
         """
-        lvs_dict = self.get_lvs_json_report(vg_lv)
-        lv_dict = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        return lv_dict[LVS_POOL_LV]
+        if vg_lv.startswith(_DEV_PREFIX_DIR):
+            vg_name, lv_name = self.vg_lv_from_device_path(vg_lv)
+        else:
+            name_parts = vg_lv.split("/")
+            if len(name_parts) != 2 or not all(name_parts):
+                raise SnapmPluginError(
+                    f"Invalid LVM2 logical volume name: {vg_lv}"
+                )
+            vg_name, lv_name = name_parts
+        return self._get_lv_dict(vg_name, lv_name)[LVS_POOL_LV]
 
     def vg_free_space(self, vg_name):
         """
         Return a tuple of the free space available as bytes and the volume
         group extent size for the volume group named ``vg_name``.
 
+        Within a transaction the result for each volume group is cached
+        until the transaction ends.
+
         :param vg_name: The name of the volume group to check.
         :returns: A 2-tuple ``(vg_free: int, vg_extent_size: int)``.
         """
+        if self._vg_free_cache is not None and vg_name in self._vg_free_cache:
+            return self._vg_free_cache[vg_name]
         vgs_dict = self.get_vgs_json_report(vg_name=vg_name)
         for vg_dict in vgs_dict[VGS_REPORT][0][VGS_VG]:
             if vg_dict["vg_name"] == vg_name:
-                vg_free = int(vg_dict["vg_free"].rstrip("B"))
-                vg_extent_size = int(vg_dict["vg_extent_size"].rstrip("B"))
+                vg_free = _parse_size(vg_dict["vg_free"])
+                vg_extent_size = _parse_size(vg_dict["vg_extent_size"])
+                if self._vg_free_cache is not None:
+                    self._vg_free_cache[vg_name] = (vg_free, vg_extent_size)
                 return (vg_free, vg_extent_size)
         raise ValueError(f"Volume group {vg_name} not found")
 
@@ -651,36 +807,97 @@ class _Lvm2(Plugin):
         """
         Return the size of the specified logical volume in bytes.
         """
-        lvs_dict = self.get_lvs_json_report(f"{vg_name}/{lv_name}")
-        for lv_dict in lvs_dict[LVS_REPORT][0][LVS_LV]:
-            if lv_dict["vg_name"] == vg_name and lv_dict["lv_name"] == lv_name:
-                return int(lv_dict["lv_size"].rstrip("B"))
-        raise ValueError(f"Logical volume {vg_name}/{lv_name} not found")
+        return _parse_size(self._get_lv_dict(vg_name, lv_name)[LVS_LV_SIZE])
 
     def pool_free_space(self, vg_name, pool_name):
         """
         Return the free space available as bytes for the thin pool identified
         by ``vg_name`` and ``pool_name``.
         """
-        lvs_dict = self.get_lvs_json_report(f"{vg_name}/{pool_name}")
-        lv_dict = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        data_percent = float(lv_dict[LVS_DATA_PERCENT])
-        pool_size = int(lv_dict[LVS_LV_SIZE].rstrip("B"))
-        return int(pool_size - floor((pool_size * data_percent) / 100.0))
+        lv_dict = self._get_lv_dict(vg_name, pool_name)
+        used, scale = _parse_percent(lv_dict[LVS_DATA_PERCENT])
+        pool_size = _parse_size(lv_dict[LVS_LV_SIZE])
+        return pool_size - (pool_size * used) // scale
+
+    def _refresh_lvs_cache(self):
+        """
+        Refresh the plugin's logical volume cache from a single ``lvs``
+        report covering all logical volumes on the system.
+
+        :returns: A dictionary mapping ``"vg_name/lv_name"`` strings to the
+                  corresponding ``lvs`` report dictionaries.
+        """
+        lvs_dict = self.get_lvs_json_report(lvs_all=True)
+        lvs_cache = {}
+        for lv_dict in lvs_dict[LVS_REPORT][0][LVS_LV]:
+            lv_name = lv_dict[LVS_LV_NAME]
+            if lv_name[:1] == LVS_LV_HIDDEN_START:
+                lv_name = lv_name[1:-1]
+            lvs_cache[f"{lv_dict[LVS_VG_NAME]}/{lv_name}"] = lv_dict
+        self._lvs_cache = lvs_cache
+        self._lvs_cache_ts = monotonic()
+        self._device_vg_lv = {}
+        return lvs_cache
+
+    def _invalidate_lvs_cache(self):
+        """
+        Invalidate the plugin's logical volume cache: the next lookup will
+        refresh it from a new ``lvs`` report. Cached ``_is_lvm_device()``
+        results are discarded as well.
+        """
+        self._lvs_cache_ts = None
+        self._device_vg_lv = {}
+        self._lvm_devices = {}
+
+    def _lvs_cache_valid(self):
+        """
+        Return ``True`` if the plugin's logical volume cache is current, or
+        ``False`` if it has expired or been invalidated.
+        """
+        cache_ts = self._lvs_cache_ts
+        return cache_ts is not None and monotonic() <= cache_ts + LVS_CACHE_VALID
+
+    def _cache_lv_dict(self, vg_name, lv_name, lv_dict):
+        """
+        Store the ``lvs`` report dictionary ``lv_dict`` for the logical
+        volume ``vg_name/lv_name`` in the plugin's logical volume cache.
+        """
+        self._lvs_cache[f"{vg_name}/{lv_name}"] = lv_dict
+
+    def _invalidate_lv_dict(self, vg_name, lv_name):
+        """
+        Discard the cached ``lvs`` report dictionary for the logical volume
+        ``vg_name/lv_name``: the next lookup queries that volume alone.
+        """
+        self._lvs_cache.pop(f"{vg_name}/{lv_name}", None)
+
+    def _get_lv_dict(self, vg_name, lv_name):
+        """
+        Return the ``lvs`` report dictionary for the logical volume
+        ``vg_name/lv_name``.
+
+        All logical volumes share one cached report: when the cache has
+        expired it is refreshed for every volume with a single call to
+        ``lvs``. Volumes missing from the report are queried individually.
+
+        :param vg_name: The volume group name.
+        :param lv_name: The logical volume name.
+        :returns: A dictionary of ``lvs`` report fields.
+        :raises: ``SnapmCalloutError`` if the logical volume cannot be found.
+        """
+        vg_lv = f"{vg_name}/{lv_name}"
+        if not self._lvs_cache_valid():
+            self._refresh_lvs_cache()
+        if vg_lv not in self._lvs_cache:
+            lvs_dict = self.get_lvs_json_report(vg_lv)
+            self._lvs_cache[vg_lv] = lvs_dict[LVS_REPORT][0][LVS_LV][0]
+        return self._lvs_cache[vg_lv]
 
     def get_lvs_json_report(self, vg_lv=None, lvs_all=False):
         """
         Call out to the ``lvs`` program and return a report in JSON format.
         """
-        lvs_cmd_args = [
-            LVS_CMD,
-            LVM_REPORT_FORMAT,
-            self._json_fmt,
-            LVM_UNITS,
-            LVM_BYTES,
-            LVM_OPTIONS,
-            LVS_FIELD_OPTIONS,
-        ]
+        lvs_cmd_args = [LVS_CMD, *self._report_args, LVS_FIELD_OPTIONS]
         if vg_lv:
             lvs_cmd_args.append(vg_lv)
         if lvs_all:
@@ -691,27 +908,13 @@ class _Lvm2(Plugin):
             raise SnapmCalloutError(
                 f"Error calling {LVS_CMD}: {_decode_stderr(err)}"
             ) from err
-        try:
-            lvs_dict = loads(lvs_cmd.stdout)
-        except JSONDecodeError as err:
-            raise SnapmCalloutError(
-                f"Unable to decode {LVS_CMD} JSON output: {err}"
-            ) from err
-        return lvs_dict
+        return _decode_json_report(LVS_CMD, lvs_cmd.stdout)
 
     def get_vgs_json_report(self, vg_name=None):
         """
         Call out to the ``vgs`` program and return a report in JSON format.
         """
-        vgs_cmd_args = [
-            VGS_CMD,
-            LVM_REPORT_FORMAT,
-            self._json_fmt,
-            LVM_UNITS,
-            LVM_BYTES,
-            LVM_OPTIONS,
-            VGS_FIELD_OPTIONS,
-        ]
+        vgs_cmd_args = [VGS_CMD, *self._report_args, VGS_FIELD_OPTIONS]
         if vg_name:
             vgs_cmd_args.append(vg_name)
         try:
@@ -720,13 +923,7 @@ class _Lvm2(Plugin):
             raise SnapmCalloutError(
                 f"Error calling {VGS_CMD}: {_decode_stderr(err)}"
             ) from err
-        try:
-            vgs_dict = loads(vgs_cmd.stdout)
-        except JSONDecodeError as err:
-            raise SnapmCalloutError(
-                f"Unable to decode {VGS_CMD} JSON output: {err}"
-            ) from err
-        return vgs_dict
+        return _decode_json_report(VGS_CMD, vgs_cmd.stdout)
 
     def _check_lvm_version(self):
         """
@@ -737,12 +934,16 @@ class _Lvm2(Plugin):
         def _version_string(value):
             return f"{value[0]}.{value[1]}.{value[2]}"
 
-        try:
-            lvm_version = self._get_lvm_version()
-        except CalledProcessError as err:
-            raise SnapmPluginError(
-                f"Error getting LVM2 version: {_decode_stderr(err)}"
-            ) from err
+        lvm_path = self._cmd_paths[LVM_CMD]
+        lvm_version = _lvm_versions.get(lvm_path)
+        if lvm_version is None:
+            try:
+                lvm_version = self._get_lvm_version()
+            except CalledProcessError as err:
+                raise SnapmPluginError(
+                    f"Error getting LVM2 version: {_decode_stderr(err)}"
+                ) from err
+            _lvm_versions[lvm_path] = lvm_version
         if lvm_version < MINIMUM_LVM_VERSION:
             raise SnapmPluginError(
                 f"Unsupported LVM2 version: {_version_string(lvm_version)} "
@@ -755,11 +956,7 @@ class _Lvm2(Plugin):
             self._json_fmt = LVM_JSON
 
     def _sanitize_environment(self):
-        env = environ.copy()
-        for var in _LVM_ENV_FILTER:
-            if var in env:
-                env.pop(var)
-        return env
+        return {var: val for var, val in environ.items() if var not in _LVM_ENV_FILTER}
 
     def __init__(self, logger, plugin_cfg):
         super().__init__(logger, plugin_cfg)
@@ -773,12 +970,100 @@ class _Lvm2(Plugin):
         # Export LC_ALL=C
         self._env["LC_ALL"] = "C"
 
+        # Logical volume report data shared by all snapshots of this plugin.
+        self._lvs_cache = {}
+        self._lvs_cache_ts = None
+
+        # Device path to (vg_name, lv_name) mappings valid with _lvs_cache.
+        self._device_vg_lv = {}
+
+        # Cached _is_lvm_device() results keyed by (device, st_rdev),
+        # discarded by _invalidate_lvs_cache().
+        self._lvm_devices = {}
+
+        # Volume group free space cached for the current transaction.
+        self._vg_free_cache = None
+
+        # Running totals of size_map values for the current transaction.
+        self._size_map_totals = None
+
+        # Snapshot names validated in the current transaction.
+        self._snapshot_names = None
+
         # Check for presence of required LVM2 binaries and device-mapper.
-        _check_lvm_present()
+        self._cmd_paths = _check_lvm_present()
 
         # Check LVM2 minimum version requirements.
         self._check_lvm_version()
 
+        # Common JSON report arguments for lvs and vgs: the report format
+        # is fixed once the LVM2 version has been checked.
+        self._report_args = (
+            LVM_REPORT_FORMAT,
+            self._json_fmt,
+            LVM_UNITS,
+            LVM_BYTES,
+            LVM_OPTIONS,
+        )
+
+    def start_transaction(self):
+        """
+        Begin a snapshot set creation transaction in this plugin.
+        """
+        super().start_transaction()
+        self._vg_free_cache = {}
+        self._size_map_totals = {}
+        self._snapshot_names = {}
+
+    def end_transaction(self):
+        """
+        End a snapshot set creation transaction in this plugin.
+        """
+        super().end_transaction()
+        self._vg_free_cache = None
+        self._size_map_totals = None
+        self._snapshot_names = None
+
+    # pylint: disable=too-many-arguments
+    def _snapshot_name(self, vg_name, lv_name, snapset_name, timestamp, mount_point):
+        """
+        Format and validate the name of the snapshot of ``vg_name/lv_name``
+        for the snapshot set ``snapset_name``.
+
+        Within a transaction the result is remembered so that
+        ``create_snapshot()`` reuses the name already validated by
+        ``check_create_snapshot()``.
+
+        :returns: The snapshot logical volume name.
+        :raises: ``SnapmInvalidIdentifierError`` if the name is not a valid
+                 LVM2 name.
+        """
+        names = self._snapshot_names
+        key = (vg_name, lv_name, snapset_name, timestamp, mount_point)
+        if names is not None and key in names:
+            return names[key]
+        snapshot_name = format_snapshot_name(
+            lv_name, snapset_name, timestamp, encode_mount_point(mount_point)
+        )
+        self._check_lvm_name(vg_name, snapshot_name)
+        if names is not None:
+            names[key] = snapshot_name
+        return snapshot_name
+
+    def _record_snapshot_size(self, total_key, sizes, lv_name, size):
+        """
+        Record ``size`` for ``lv_name`` in the ``size_map`` dictionary
+        ``sizes`` and update the running total for ``total_key``.
+
+        :param total_key: The key of the running total to update.
+        :param sizes: The ``size_map`` dictionary to update.
+        :param lv_name: The name of the origin logical volume.
+        :param size: The snapshot size for ``lv_name``.
+        """
+        totals = self._size_map_totals
+        totals[total_key] = totals.get(total_key, 0) - sizes.get(lv_name, 0) + size
+        sizes[lv_name] = size
+
     def _activate(self, active, name, silent=False):
         """
         Call lvchange to activate or deactivate an LVM2 volume.
@@ -787,21 +1072,12 @@ class _Lvm2(Plugin):
         :param silent: ``True`` if errors should not be propagated or
                        ``False`` otherwise.
         """
-        lvchange_cmd = [
-            LVCHANGE_CMD,
-            LVCHANGE_YES,
-            LVCHANGE_IGNOREACTIVATIONSKIP,
-            LVCHANGE_ACTIVATE,
-            active,
-            name,
-        ]
+        lvchange_cmd = [*_LVCHANGE_ACTIVATE_ARGS, active, name]
         try:
-            self._run(lvchange_cmd, capture_output=True, check=True)
-        except CalledProcessError as err:
+            self._run_lvm_change(lvchange_cmd)
+        except SnapmCalloutError:
             if not silent:
-                raise SnapmCalloutError(
-                    f"{LVCHANGE_CMD} failed with: {_decode_stderr(err)}"
-                ) from err
+                raise
 
     def discover_snapshots(self):
         """
@@ -865,7 +1141,7 @@ class _Lvm2(Plugin):
         if not self._is_lvm_device(device):
             return None
         (vg_name, lv_name) = self.vg_lv_from_device_path(device)
-        return path_join(DEV_PREFIX, vg_name, lv_name)
+        return f"{DEV_PREFIX}/{vg_name}/{lv_name}"
 
     def delete_snapshot(self, name):
         """
@@ -873,13 +1149,8 @@ class _Lvm2(Plugin):
 
         :param name: The name of the snapshot to be removed.
         """
-        lvremove_cmd = [LVREMOVE_CMD, LVREMOVE_YES, name]
-        try:
-            self._run(lvremove_cmd, capture_output=True, check=True)
-        except CalledProcessError as err:
-            raise SnapmCalloutError(
-                f"{LVREMOVE_CMD} failed with: {_decode_stderr(err)}"
-            ) from err
+        lvremove_cmd = [*_LVREMOVE_ARGS, name]
+        self._run_lvm_change(lvremove_cmd)
 
     # pylint: disable=too-many-arguments
     def rename_snapshot(self, old_name, origin, snapset_name, timestamp, mount_point):
@@ -910,12 +1181,7 @@ class _Lvm2(Plugin):
             old_name,
             new_name,
         ]
-        try:
-            self._run(lvrename_cmd, capture_output=True, check=True)
-        except CalledProcessError as err:
-            raise SnapmCalloutError(
-                f"{LVRENAME_CMD} failed with: {_decode_stderr(err)}"
-            ) from err
+        self._run_lvm_change(lvrename_cmd)
 
         return self._build_snapshot(
             f"{vg_name}/{new_name}",
@@ -941,9 +1207,7 @@ class _Lvm2(Plugin):
         merged.
         """
         vg_name, lv_name = vg_lv_from_origin(origin)
-        lvs_dict = self.get_lvs_json_report(f"{vg_name}/{lv_name}")
-        lv_report = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        lv_attr = lv_report[LVS_LV_ATTR]
+        lv_attr = self._get_lv_dict(vg_name, lv_name)[LVS_LV_ATTR]
         if lv_attr[0] == LVM_LV_ORIGIN_MERGING:
             raise SnapmBusyError(
                 f"Snapshot revert is in progress for {name} origin volume {vg_name}/{lv_name}"
@@ -963,6 +1227,7 @@ class _Lvm2(Plugin):
             LVCONVERT_MERGE,
             name,
         ]
+        self._invalidate_lvs_cache()
         try:
             self._run(lvconvert_cmd, capture_output=False, check=True)
         except CalledProcessError as err:
@@ -996,32 +1261,37 @@ class _Lvm2(Plugin):
         :param auto: ``True`` to enable autoactivation or ``False`` otherwise.
         """
         lvchange_cmd = [
-            LVCHANGE_CMD,
-            LVCHANGE_SETACTIVATIONSKIP,
+            *_LVCHANGE_SETACTIVATIONSKIP_ARGS,
             LVCHANGE_ACTIVATIONSKIP_NO if auto else LVCHANGE_ACTIVATIONSKIP_YES,
             name,
         ]
-        try:
-            self._run(lvchange_cmd, capture_output=True, check=True)
-        except CalledProcessError as err:
-            raise SnapmCalloutError(
-                f"{LVCHANGE_CMD} failed with: {_decode_stderr(err)}"
-            ) from err
+        self._run_lvm_change(lvchange_cmd)
 
     def _check_lvm_name(self, vg_name, lv_name):
         """
-        Check whether a proposed LVM name exceeds the maximum allowed name
-        length for an LVM2 logical volume.
+        Check whether a proposed LVM name is valid for an LVM2 logical
+        volume: the name must only use characters accepted by LVM2, must
+        not use a reserved name or prefix, and must not exceed the maximum
+        allowed name length.
 
         :param vg_name: The volume group name to check.
         :param lv_name: The logical volume name to check.
-        :raises: ``SnapmInvalidIdentifierError`` if the proposed name exceeds
-                 limits.
+        :raises: ``SnapmInvalidIdentifierError`` if the proposed name is
+                 invalid or exceeds limits.
         """
-        full_name = f"{vg_name}/{lv_name}"
-        if len(full_name) > self.max_name_len:
+        if not _LVM_NAME_REGEX.fullmatch(lv_name) or lv_name in (".", ".."):
+            raise SnapmInvalidIdentifierError(
+                f"Logical volume name {vg_name}/{lv_name} is not a valid LVM2 name"
+            )
+        if _LVM_RESERVED_NAME_REGEX.search(lv_name):
+            raise SnapmInvalidIdentifierError(
+                f"Logical volume name {vg_name}/{lv_name} uses a reserved LVM2 name"
+            )
+        # Compare the component lengths: the full "vg/lv" name is only
+        # formatted for the error message.
+        if len(vg_name) + 1 + len(lv_name) > self.max_name_len:
             raise SnapmInvalidIdentifierError(
-                f"Logical volume name {full_name} exceeds maximum LVM2 name length"
+                f"Logical volume name {vg_name}/{lv_name} exceeds maximum LVM2 name length"
             )
 
     def _build_snapshot(
@@ -1077,39 +1347,30 @@ class Lvm2Cow(_Lvm2):
         :returns: A list of ``Lvm2Snapshot`` objects discovered by this plugin.
         """
         snapshots = []
-        lvs_dict = self.get_lvs_json_report(lvs_all=True)
-        for lv_dict in lvs_dict[LVS_REPORT][0][LVS_LV]:
+        origins = {}
+        for vg_lv, lv_dict in self._refresh_lvs_cache().items():
             if filter_cow_snapshot(lv_dict):
-                try:
-                    lv_name = lv_dict[LVS_LV_NAME]
-                    if lv_name.startswith(LVS_LV_HIDDEN_START):
-                        lv_name = lv_name[1:-1]
-                    fields = parse_snapshot_name(lv_name, lv_dict[LVS_LV_ORIGIN])
-                except ValueError:
-                    continue
+                vg_name, _, lv_name = vg_lv.partition("/")
+                lv_origin = lv_dict[LVS_LV_ORIGIN]
+                fields = parse_snapshot_name(lv_name, lv_origin)
                 if fields is not None:
                     (snapset, timestamp, mount_point) = fields
-                    full_name = f"{lv_dict[LVS_VG_NAME]}/{lv_name}"
-                    self._log_debug("Found %s snapshot: %s", self.name, full_name)
-                    snapshots.append(
-                        Lvm2CowSnapshot(
-                            full_name,
-                            snapset,
-                            f"{lv_dict[LVS_LV_ORIGIN]}",
-                            timestamp,
-                            mount_point,
-                            self,
-                            f"{lv_dict[LVS_VG_NAME]}",
-                            f"{lv_name}",
-                            lv_dict=lv_dict,
-                        )
+                    self._log_debug("Found %s snapshot: %s", self.name, vg_lv)
+                    snapshot = Lvm2CowSnapshot(
+                        vg_lv,
+                        snapset,
+                        lv_origin,
+                        timestamp,
+                        mount_point,
+                        self,
+                        vg_name,
+                        lv_name,
                     )
+                    snapshots.append(snapshot)
+                    origin = snapshot.origin
+                    origins[origin] = origins.get(origin, 0) + 1
 
-        for snapshot in snapshots:
-            if snapshot.origin not in self.origins:
-                self.origins[snapshot.origin] = 1
-            else:
-                self.origins[snapshot.origin] += 1
+        self.origins = origins
 
         if self.limits.snapshots_per_origin > 0:
             for origin, count in self.origins.items():
@@ -1141,9 +1402,7 @@ class Lvm2Cow(_Lvm2):
             return False
 
         (vg_name, lv_name) = self.vg_lv_from_device_path(device)
-        lvs_dict = self.get_lvs_json_report(f"{vg_name}/{lv_name}")
-        lv_report = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        lv_attr = lv_report[LVS_LV_ATTR]
+        lv_attr = self._get_lv_dict(vg_name, lv_name)[LVS_LV_ATTR]
         if lv_attr[0] == LVM_LV_ORIGIN_MERGING:
             raise SnapmBusyError(
                 f"Snapshot revert is in progress for {self.name} origin volume {vg_name}/{lv_name}"
@@ -1151,8 +1410,10 @@ class Lvm2Cow(_Lvm2):
 
         return True
 
-    # pylint: disable=too-many-locals
-    def _check_free_space(self, origin, mount_point, size_policy, snapshot_name=None):
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _check_free_space(
+        self, origin, mount_point, size_policy, snapshot_name=None, lv_dict=None
+    ):
         """
         Check for available space in volume group ``vg_name`` for the specified
         mount point.
@@ -1162,6 +1423,7 @@ class Lvm2Cow(_Lvm2):
         :param size_policy: A ``SizePolicy`` to apply to this source.
         :param snapshot_name: An optional LV name: if set treat this as a resize operation
                      for the snapshot logical volume named ``name``.
+        :param lv_dict: An optional ``lvs`` report dictionary for ``origin``.
         :returns: The space used on the mount point.
         :raises: ``SnapmNoSpaceError`` if the minimum snapshot size exceeds the
                  available space.
@@ -1170,7 +1432,9 @@ class Lvm2Cow(_Lvm2):
         vg_name, lv_name = vg_lv_from_origin(origin)
         fs_used = mount_point_space_used(mount_point)
         vg_free, vg_extent_size = self.vg_free_space(vg_name)
-        lv_size = self.lv_dev_size(vg_name, lv_name)
+        if lv_dict is None:
+            lv_dict = self._get_lv_dict(vg_name, lv_name)
+        lv_size = _parse_size(lv_dict[LVS_LV_SIZE])
 
         # Determine current size if resizing
         current_size = 0
@@ -1207,7 +1471,7 @@ class Lvm2Cow(_Lvm2):
                 f"{self.name} does not support shrinking snapshots"
             )
         needed = rounded_size - current_size
-        used = sum(self.size_map[vg_name].values())
+        used = self._size_map_totals.get(vg_name, 0)
         if vg_free < (used + needed):
             raise SnapmNoSpaceError(
                 f"Volume group {vg_name} has insufficient free space to snapshot {mount_point} "
@@ -1239,22 +1503,21 @@ class Lvm2Cow(_Lvm2):
         self, origin, snapset_name, timestamp, mount_point, size_policy
     ):
         vg_name, lv_name = vg_lv_from_origin(origin)
-        snapshot_name = format_snapshot_name(
-            lv_name, snapset_name, timestamp, encode_mount_point(mount_point)
-        )
-        self._check_lvm_name(vg_name, snapshot_name)
-        if vg_name not in self.size_map:
-            self.size_map[vg_name] = {}
-        self.size_map[vg_name][lv_name] = self._check_free_space(
-            origin,
-            mount_point,
-            size_policy,
-        )
+        self._snapshot_name(vg_name, lv_name, snapset_name, timestamp, mount_point)
         if self._check_limits(origin):
             raise SnapmLimitError(
                 f"Adding snapshot of {mount_point} would exceed MaxSnapshotsPerOrigin "
                 f"for {origin} ({self.limits.snapshots_per_origin})"
             )
+        needed = self._check_free_space(
+            origin,
+            mount_point,
+            size_policy,
+            lv_dict=self._get_lv_dict(vg_name, lv_name),
+        )
+        self._record_snapshot_size(
+            vg_name, self.size_map.setdefault(vg_name, {}), lv_name, needed
+        )
 
     def create_snapshot(
         self, origin, snapset_name, timestamp, mount_point, size_policy
@@ -1269,25 +1532,17 @@ class Lvm2Cow(_Lvm2):
             "mounted at" if mount_point else "",
             mount_point,
         )
-        snapshot_name = format_snapshot_name(
-            lv_name, snapset_name, timestamp, encode_mount_point(mount_point)
+        snapshot_name = self._snapshot_name(
+            vg_name, lv_name, snapset_name, timestamp, mount_point
         )
-        self._check_lvm_name(vg_name, snapshot_name)
         lvcreate_cmd = [
-            LVCREATE_CMD,
-            LVCREATE_SNAPSHOT,
-            LVCREATE_NAME,
+            *_LVCREATE_SNAPSHOT_ARGS,
             snapshot_name,
             LVCREATE_SIZE,
             f"{snapshot_size}b",
             origin,
         ]
-        try:
-            self._run(lvcreate_cmd, capture_output=True, check=True)
-        except CalledProcessError as err:
-            raise SnapmCalloutError(
-                f"{LVCREATE_CMD} failed with: {_decode_stderr(err)}"
-            ) from err
+        self._run_lvm_change(lvcreate_cmd)
 
         if origin not in self.origins:
             self.origins[origin] = 1
@@ -1307,13 +1562,15 @@ class Lvm2Cow(_Lvm2):
 
     def check_resize_snapshot(self, name, origin, mount_point, size_policy):
         vg_name, lv_name = vg_lv_from_origin(origin)
-        if vg_name not in self.size_map:
-            self.size_map[vg_name] = {}
-        self.size_map[vg_name][lv_name] = self._check_free_space(
+        needed = self._check_free_space(
             origin,
             mount_point,
             size_policy,
             snapshot_name=name,
+            lv_dict=self._get_lv_dict(vg_name, lv_name),
+        )
+        self._record_snapshot_size(
+            vg_name, self.size_map.setdefault(vg_name, {}), lv_name, needed
         )
 
     def resize_snapshot(self, name, origin, mount_point, size_policy):
@@ -1324,18 +1581,8 @@ class Lvm2Cow(_Lvm2):
             self._log_debug(
                 "Resizing CoW snapshot %s by +%s", name, size_fmt(size_change)
             )
-            lvresize_cmd = [
-                LVRESIZE_CMD,
-                LVCREATE_SIZE,
-                f"+{size_change}b",
-                name,
-            ]
-            try:
-                self._run(lvresize_cmd, capture_output=True, check=True)
-            except CalledProcessError as err:
-                raise SnapmCalloutError(
-                    f"{LVRESIZE_CMD} failed with: {_decode_stderr(err)}"
-                ) from err
+            lvresize_cmd = [*_LVRESIZE_ARGS, f"+{size_change}b", name]
+            self._run_lvm_change(lvresize_cmd)
         else:
             self._log_debug("Skipping no-op resize for %s", name)
 
@@ -1381,44 +1628,73 @@ class Lvm2Thin(_Lvm2):
     def __init__(self, logger, plugin_cfg):
         super().__init__(logger, plugin_cfg)
         self.pools = {}
+        # Origin thin pools recorded in the current transaction.
+        self._origin_pools = None
         if self.priority == PLUGIN_NO_PRIORITY:
             self.priority = LVM2_THIN_STATIC_PRIORITY
 
+    def start_transaction(self):
+        """
+        Begin a snapshot set creation transaction in this plugin.
+        """
+        super().start_transaction()
+        self._origin_pools = {}
+
+    def end_transaction(self):
+        """
+        End a snapshot set creation transaction in this plugin.
+        """
+        super().end_transaction()
+        self._origin_pools = None
+
+    def _origin_pool_name(self, vg_name, lv_name):
+        """
+        Return the thin pool of the origin ``vg_name/lv_name``.
+
+        Within a transaction the pool recorded by ``check_create_snapshot()``
+        is returned without consulting the logical volume cache.
+
+        :raises: ``SnapmPluginError`` if ``vg_name/lv_name`` is not a thin
+                 volume.
+        """
+        pools = self._origin_pools
+        if pools is not None and (vg_name, lv_name) in pools:
+            return pools[(vg_name, lv_name)]
+        pool_name = self._get_lv_dict(vg_name, lv_name)[LVS_POOL_LV]
+        if not pool_name:
+            raise SnapmPluginError(
+                f"Logical volume {vg_name}/{lv_name} is not a thin volume"
+            )
+        if pools is not None:
+            pools[(vg_name, lv_name)] = pool_name
+        return pool_name
+
     def discover_snapshots(self):
         snapshots = []
-        lvs_dict = self.get_lvs_json_report(lvs_all=True)
-        for lv_dict in lvs_dict[LVS_REPORT][0][LVS_LV]:
+        pools = {}
+        for vg_lv, lv_dict in self._refresh_lvs_cache().items():
             if filter_thin_snapshot(lv_dict):
-                try:
-                    lv_name = lv_dict[LVS_LV_NAME]
-                    if lv_name.startswith(LVS_LV_HIDDEN_START):
-                        lv_name = lv_name[1:-1]
-                    fields = parse_snapshot_name(lv_name, lv_dict[LVS_LV_ORIGIN])
-                except ValueError:
-                    continue
+                vg_name, _, lv_name = vg_lv.partition("/")
+                lv_origin = lv_dict[LVS_LV_ORIGIN]
+                fields = parse_snapshot_name(lv_name, lv_origin)
                 if fields is not None:
-                    full_name = f"{lv_dict[LVS_VG_NAME]}/{lv_name}"
-                    self._log_debug("Found %s snapshot: %s", self.name, full_name)
+                    self._log_debug("Found %s snapshot: %s", self.name, vg_lv)
                     (snapset, timestamp, mount_point) = fields
-                    snapshots.append(
-                        Lvm2ThinSnapshot(
-                            full_name,
-                            snapset,
-                            f"{lv_dict[LVS_LV_ORIGIN]}",
-                            timestamp,
-                            mount_point,
-                            self,
-                            f"{lv_dict[LVS_VG_NAME]}",
-                            f"{lv_name}",
-                            lv_dict=lv_dict,
-                        )
+                    snapshot = Lvm2ThinSnapshot(
+                        vg_lv,
+                        snapset,
+                        lv_origin,
+                        timestamp,
+                        mount_point,
+                        self,
+                        vg_name,
+                        lv_name,
                     )
+                    snapshots.append(snapshot)
+                    pool = snapshot.pool
+                    pools[pool] = pools.get(pool, 0) + 1
 
-        for snapshot in snapshots:
-            if snapshot.pool not in self.pools:
-                self.pools[snapshot.pool] = 1
-            else:
-                self.pools[snapshot.pool] += 1
+        self.pools = pools
 
         if self.limits.snapshots_per_pool > 0:
             for pool, count in self.pools.items():
@@ -1449,9 +1725,7 @@ class Lvm2Thin(_Lvm2):
             return False
 
         (vg_name, lv_name) = self.vg_lv_from_device_path(device)
-        lvs_dict = self.get_lvs_json_report(f"{vg_name}/{lv_name}")
-        lv_report = lvs_dict[LVS_REPORT][0][LVS_LV][0]
-        lv_attr = lv_report[LVS_LV_ATTR]
+        lv_attr = self._get_lv_dict(vg_name, lv_name)[LVS_LV_ATTR]
         if lv_attr[0] == LVM_LV_ORIGIN_MERGING:
             raise SnapmBusyError(
                 f"Snapshot revert is in progress for {self.name} origin volume {vg_name}/{lv_name}"
@@ -1461,27 +1735,33 @@ class Lvm2Thin(_Lvm2):
 
         return True
 
-    def _check_free_space(self, origin, pool_name, mount_point, size_policy):
+    # pylint: disable=too-many-arguments
+    def _check_free_space(
+        self, origin, pool_name, mount_point, size_policy, lv_dict=None
+    ):
         """
         Check for available space in pool ``pool_name`` for the specified
         mount point.
 
         :param pool_name: The name of the pool to check.
         :param mount_point: The mount point path to check.
+        :param lv_dict: An optional ``lvs`` report dictionary for ``origin``.
         :returns: The space used on the mount point.
         :raises: ``SnapmNoSpaceError`` if the minimum snapshot size exceeds the
                  available space.
         """
         vg_name, lv_name = vg_lv_from_origin(origin)
         fs_used = mount_point_space_used(mount_point)
-        lv_size = self.lv_dev_size(vg_name, lv_name)
+        if lv_dict is None:
+            lv_dict = self._get_lv_dict(vg_name, lv_name)
+        lv_size = _parse_size(lv_dict[LVS_LV_SIZE])
         pool_free = self.pool_free_space(vg_name, pool_name)
         policy = SizePolicy(
             origin, mount_point, pool_free, fs_used, lv_size, size_policy
         )
         snapshot_min_size = policy.size
         if pool_free < (
-            sum(self.size_map[vg_name][pool_name].values()) + snapshot_min_size
+            self._size_map_totals.get((vg_name, pool_name), 0) + snapshot_min_size
         ):
             raise SnapmNoSpaceError(
                 f"Volume group thin pool {vg_name}/{pool_name} "
@@ -1513,23 +1793,23 @@ class Lvm2Thin(_Lvm2):
         self, origin, snapset_name, timestamp, mount_point, size_policy
     ):
         vg_name, lv_name = vg_lv_from_origin(origin)
-        pool_name = self.pool_name_from_vg_lv(origin)
-        snapshot_name = format_snapshot_name(
-            lv_name, snapset_name, timestamp, encode_mount_point(mount_point)
-        )
-        self._check_lvm_name(vg_name, snapshot_name)
-        if vg_name not in self.size_map:
-            self.size_map[vg_name] = {}
-        if pool_name not in self.size_map[vg_name]:
-            self.size_map[vg_name][pool_name] = {}
-        self.size_map[vg_name][pool_name][lv_name] = self._check_free_space(
-            origin, pool_name, mount_point, size_policy
-        )
+        lv_dict = self._get_lv_dict(vg_name, lv_name)
+        pool_name = self._origin_pool_name(vg_name, lv_name)
+        self._snapshot_name(vg_name, lv_name, snapset_name, timestamp, mount_point)
         if self._check_limits(pool_name):
             raise SnapmLimitError(
                 f"Adding snapshot of {mount_point} would exceed MaxSnapshotsPerPool "
                 f"for {pool_name} ({self.limits.snapshots_per_pool})"
             )
+        needed = self._check_free_space(
+            origin, pool_name, mount_point, size_policy, lv_dict=lv_dict
+        )
+        self._record_snapshot_size(
+            (vg_name, pool_name),
+            self.size_map.setdefault(vg_name, {}).setdefault(pool_name, {}),
+            lv_name,
+            needed,
+        )
 
     def create_snapshot(
         self, origin, snapset_name, timestamp, mount_point, size_policy
@@ -1541,25 +1821,13 @@ class Lvm2Thin(_Lvm2):
             lv_name,
             mount_point,
         )
-        snapshot_name = format_snapshot_name(
-            lv_name, snapset_name, timestamp, encode_mount_point(mount_point)
+        snapshot_name = self._snapshot_name(
+            vg_name, lv_name, snapset_name, timestamp, mount_point
         )
-        self._check_lvm_name(vg_name, snapshot_name)
-        pool_name = self.pool_name_from_vg_lv(origin)
+        pool_name = self._origin_pool_name(vg_name, lv_name)
 
-        lvcreate_cmd = [
-            LVCREATE_CMD,
-            LVCREATE_SNAPSHOT,
-            LVCREATE_NAME,
-            snapshot_name,
-            origin,
-        ]
-        try:
-            self._run(lvcreate_cmd, capture_output=True, check=True)
-        except CalledProcessError as err:
-            raise SnapmCalloutError(
-                f"{LVCREATE_CMD} failed with: {_decode_stderr(err)}"
-            ) from err
+        lvcreate_cmd = [*_LVCREATE_SNAPSHOT_ARGS, snapshot_name, origin]
+        self._run_lvm_change(lvcreate_cmd)
 
         if pool_name not in self.pools:
             self.pools[pool_name] = 1
@@ -1579,13 +1847,16 @@ class Lvm2Thin(_Lvm2):
 
     def check_resize_snapshot(self, name, origin, mount_point, size_policy):
         vg_name, lv_name = vg_lv_from_origin(origin)
-        pool_name = self.pool_name_from_vg_lv(origin)
-        if vg_name not in self.size_map:
-            self.size_map[vg_name] = {}
-        if pool_name not in self.size_map[vg_name]:
-            self.size_map[vg_name][pool_name] = {}
-        self.size_map[vg_name][pool_name][lv_name] = self._check_free_space(
-            origin, pool_name, mount_point, size_policy
+        lv_dict = self._get_lv_dict(vg_name, lv_name)
+        pool_name = lv_dict[LVS_POOL_LV]
+        needed = self._check_free_space(
+            origin, pool_name, mount_point, size_policy, lv_dict=lv_dict
+        )
+        self._record_snapshot_size(
+            (vg_name, pool_name),
+            self.size_map.setdefault(vg_name, {}).setdefault(pool_name, {}),
+            lv_name,
+            needed,
         )
 
     def resize_snapshot(self, name, origin, mount_point, size_policy):
@@ -1604,7 +1875,7 @@ class Lvm2Thin(_Lvm2):
         lv_dict=None,
     ):
         """
-        Build an instance of `Lvm2CowSnapshot` and return it.
+        Build an instance of `Lvm2ThinSnapshot` and return it.
         """
         return Lvm2ThinSnapshot(
             name,
@@ -506,10 +506,7 @@ class Stratis(Plugin):
                 managed_objects, filesystem.Pool(), str(filesystem.Origin()[1])
             )
 
-            try:
-                fields = parse_snapshot_name(filesystem_name, origin)
-            except ValueError:
-                continue
+            fields = parse_snapshot_name(filesystem_name, origin)
             if fields is not None:
                 (snapset, timestamp, mount_point) = fields
                 full_name = f"{pool_name}/{filesystem_name}"
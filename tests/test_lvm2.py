@@ -11,11 +11,17 @@ import os.path
 import os
 
 from configparser import ConfigParser
+from subprocess import CalledProcessError
 
 log = logging.getLogger()
 
 import snapm.manager.plugins.lvm2 as lvm2
-from snapm import SnapmCalloutError
+from snapm import (
+    SnapmCalloutError,
+    SnapmInvalidIdentifierError,
+    SnapmPluginError,
+    SnapStatus,
+)
 
 
 class Lvm2Tests(unittest.TestCase):
@@ -82,6 +88,53 @@ class Lvm2Tests(unittest.TestCase):
         with self.assertRaises(ValueError):
             lvm2._round_up_extents(-4096, 1048576)
 
+    def test__round_up_extents_non_integer_raises(self):
+        with self.assertRaises(ValueError):
+            lvm2._round_up_extents(1048576, "4096")
+        with self.assertRaises(ValueError):
+            lvm2._round_up_extents("1048576", 4096)
+
+    def test__parse_size(self):
+        sizes = {
+            "1073741824B": 1073741824,
+            "1073741824": 1073741824,
+            "0B": 0,
+        }
+        for value, size in sizes.items():
+            with self.subTest(value=value):
+                self.assertEqual(lvm2._parse_size(value), size)
+
+    def test__parse_percent(self):
+        percents = {
+            "13.02": (1302, 10000),
+            13.02: (1302, 10000),
+            "0.00": (0, 10000),
+            "100": (100, 100),
+        }
+        for value, ratio in percents.items():
+            with self.subTest(value=value):
+                self.assertEqual(lvm2._parse_percent(value), ratio)
+
+    def test__decode_stderr(self):
+        err = CalledProcessError(5, ["lvcreate"], stderr=b"  Volume group not found\n")
+        self.assertEqual(lvm2._decode_stderr(err), "Volume group not found")
+
+    def test__decode_stderr_invalid_utf8(self):
+        err = CalledProcessError(5, ["lvcreate"], stderr=b"bad \xff byte")
+        self.assertEqual(lvm2._decode_stderr(err), "bad \ufffd byte")
+
+    def test__decode_stderr_not_captured(self):
+        err = CalledProcessError(5, ["lvconvert"])
+        self.assertEqual(lvm2._decode_stderr(err), str(err))
+
+    def test__decode_json_report(self):
+        report = lvm2._decode_json_report("lvs", b'{"report": [{"lv": []}]}')
+        self.assertEqual(report, {"report": [{"lv": []}]})
+
+    def test__decode_json_report_invalid_raises(self):
+        with self.assertRaises(SnapmCalloutError):
+            lvm2._decode_json_report("lvs", b"  Volume group not found\n")
+
     def test_lvm2cow_is_lvm_device(self):
         lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
         devs = {
@@ -130,9 +183,18 @@ class Lvm2Tests(unittest.TestCase):
             if devs[dev] is not None:
                 self.assertEqual(lvm2cow.vg_lv_from_device_path(dev), devs[dev])
             else:
-                with self.assertRaises(SnapmCalloutError) as cm:
+                with self.assertRaises(SnapmCalloutError):
                     lvm2cow.vg_lv_from_device_path(dev)
 
+    def test_vg_lv_from_device_path_cache(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        lvm2cow._refresh_lvs_cache()
+        dev = "/dev/mapper/fedora-home"
+        self.assertEqual(lvm2cow.vg_lv_from_device_path(dev), ("fedora", "home"))
+        self.assertEqual(lvm2cow._device_vg_lv, {dev: ("fedora", "home")})
+        lvm2cow._invalidate_lvs_cache()
+        self.assertEqual(lvm2cow._device_vg_lv, {})
+
     def test_vg_lv_from_origin(self):
         devs = {
             "/dev/fedora/root": ("fedora", "root"),
@@ -148,15 +210,31 @@ class Lvm2Tests(unittest.TestCase):
         devs = {
             "fedora/srv": "pool0",
             "fedora/home": "",
+            "/dev/fedora/home": "",
+            "/dev/mapper/fedora-home": "",
         }
         for dev in devs.keys():
             self.assertEqual(lvm2thin.pool_name_from_vg_lv(dev), devs[dev])
 
+    def test_pool_name_from_vg_lv_bad_name(self):
+        lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
+        for vg_lv in ["fedora-home", "fedora/home/extra", "/fedora"]:
+            with self.subTest(vg_lv=vg_lv):
+                with self.assertRaises(SnapmPluginError):
+                    lvm2thin.pool_name_from_vg_lv(vg_lv)
+
     def test_pool_name_from_vg_lv_bad_lv(self):
         lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
-        with self.assertRaises(SnapmCalloutError) as cm:
+        with self.assertRaises(SnapmCalloutError):
             lvm2thin.pool_name_from_vg_lv("some/lv")
 
+    def test_lv_dev_size(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        self.assertEqual(lvm2cow.lv_dev_size("fedora", "home"), 1073741824)
+        self.assertEqual(lvm2cow.lv_dev_size("fedora", "srv"), 524288000)
+        with self.assertRaises(SnapmCalloutError):
+            lvm2cow.lv_dev_size("some", "lv")
+
     def test_pool_free_space(self):
         lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
         pools = {
@@ -168,7 +246,7 @@ class Lvm2Tests(unittest.TestCase):
             if pools[pool] is not None:
                 self.assertEqual(lvm2thin.pool_free_space(pool[0], pool[1]), pools[pool])
             else:
-                with self.assertRaises(SnapmCalloutError) as cm:
+                with self.assertRaises(SnapmCalloutError):
                     lvm2thin.pool_free_space(pool[0], pool[1])
 
     def test_vg_free_space(self):
@@ -183,9 +261,57 @@ class Lvm2Tests(unittest.TestCase):
             if groups[vg][0] != -1:
                 self.assertEqual(lvm2cow.vg_free_space(vg), groups[vg])
             else:
-                with self.assertRaises(SnapmCalloutError) as cm:
+                with self.assertRaises(SnapmCalloutError):
                     lvm2cow.vg_free_space(vg)
 
+    def test_vg_free_space_transaction_cache(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        lvm2cow.start_transaction()
+        self.assertEqual(lvm2cow.vg_free_space("fedora"), (9097445376, 4096 * 1024))
+        self.assertEqual(lvm2cow._vg_free_cache, {"fedora": (9097445376, 4096 * 1024)})
+        lvm2cow.end_transaction()
+        self.assertIsNone(lvm2cow._vg_free_cache)
+
+    def test__record_snapshot_size(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        lvm2cow.start_transaction()
+        sizes = lvm2cow.size_map.setdefault("fedora", {})
+        lvm2cow._record_snapshot_size("fedora", sizes, "root", 1024)
+        lvm2cow._record_snapshot_size("fedora", sizes, "home", 2048)
+        lvm2cow._record_snapshot_size("fedora", sizes, "root", 512)
+        self.assertEqual(sizes, {"root": 512, "home": 2048})
+        self.assertEqual(lvm2cow._size_map_totals["fedora"], sum(sizes.values()))
+        lvm2cow.end_transaction()
+        self.assertIsNone(lvm2cow._size_map_totals)
+
+    def test__origin_pool_name(self):
+        lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
+        self.assertEqual(lvm2thin._origin_pool_name("fedora", "srv"), "pool0")
+        lvm2thin.start_transaction()
+        self.assertEqual(lvm2thin._origin_pool_name("fedora", "srv"), "pool0")
+        self.assertEqual(lvm2thin._origin_pools, {("fedora", "srv"): "pool0"})
+        lvm2thin.end_transaction()
+        self.assertIsNone(lvm2thin._origin_pools)
+
+    def test__origin_pool_name_not_thin_raises(self):
+        lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
+        with self.assertRaises(SnapmPluginError):
+            lvm2thin._origin_pool_name("fedora", "root")
+        with self.assertRaises(SnapmCalloutError):
+            lvm2thin._origin_pool_name("some", "lv")
+
+    def test__snapshot_name(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        lvm2cow.start_transaction()
+        name = lvm2cow._snapshot_name("fedora", "root", "backup", 1693921253, "/")
+        self.assertEqual(name, "root-snapset_backup_1693921253_-")
+        self.assertEqual(
+            lvm2cow._snapshot_names,
+            {("fedora", "root", "backup", 1693921253, "/"): name},
+        )
+        lvm2cow.end_transaction()
+        self.assertIsNone(lvm2cow._snapshot_names)
+
     def test_lvm2cow_discover_snapshots(self):
         lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
         snapshots = lvm2cow.discover_snapshots()
@@ -197,3 +323,105 @@ class Lvm2Tests(unittest.TestCase):
         snapshots = lvm2thin.discover_snapshots()
         # FIXME: hardcoded value based on test data
         self.assertEqual(len(snapshots), 5)
+
+    def test_discover_snapshots_counts(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
+        for plugin, counts in ((lvm2cow, "origins"), (lvm2thin, "pools")):
+            with self.subTest(plugin=plugin.name):
+                snapshots = plugin.discover_snapshots()
+                self.assertEqual(sum(getattr(plugin, counts).values()), len(snapshots))
+                # Rediscovery replaces rather than accumulates the counts.
+                plugin.discover_snapshots()
+                self.assertEqual(sum(getattr(plugin, counts).values()), len(snapshots))
+
+    def test_lvm2snapshot_status(self):
+        lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
+        snapshot = lvm2thin.discover_snapshots()[0]
+        attrs = {
+            "Vwi---tz-k": SnapStatus.INACTIVE,
+            "Vwi-a-tz-k": SnapStatus.ACTIVE,
+            "Vwi-I-tz-k": SnapStatus.INVALID,
+            "Swi-a-s---": SnapStatus.REVERTING,
+            "Swi-I-s---": SnapStatus.INVALID,
+        }
+        for lv_attr, status in attrs.items():
+            with self.subTest(lv_attr=lv_attr):
+                snapshot._get_lv_dict_cache()["lv_attr"] = lv_attr
+                self.assertEqual(snapshot.status, status)
+
+    def test_lvm2snapshot_invalidate_cache(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        snapshots = {s.name: s for s in lvm2cow.discover_snapshots()}
+        snapshot = snapshots["fedora/home-snapset_backup_1693921253_-home"]
+        cache_size = len(lvm2cow._lvs_cache)
+        cache_ts = lvm2cow._lvs_cache_ts
+        snapshot.invalidate_cache()
+        # Only this snapshot's entry is discarded: the cache stays valid.
+        self.assertNotIn(snapshot.name, lvm2cow._lvs_cache)
+        self.assertEqual(len(lvm2cow._lvs_cache), cache_size - 1)
+        self.assertEqual(lvm2cow._lvs_cache_ts, cache_ts)
+        # The next lookup re-queries the single logical volume.
+        self.assertEqual(snapshot.size, 314572800)
+        self.assertIn(snapshot.name, lvm2cow._lvs_cache)
+
+    def test__refresh_lvs_cache(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        lvs_cache = lvm2cow._refresh_lvs_cache()
+        # FIXME: hardcoded value based on test data
+        self.assertEqual(len(lvs_cache), 27)
+        self.assertEqual(lvs_cache["fedora/pool0"]["lv_size"], "1073741824B")
+        self.assertIs(lvm2cow._lvs_cache, lvs_cache)
+
+    def test__invalidate_lvs_cache_clears_lvm_devices(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        cache_key = ("/dev/mapper/fedora-root", 0xFD00)
+        lvm2cow._lvm_devices[cache_key] = True
+        # A report refresh does not change device numbers: keep the result.
+        lvm2cow._refresh_lvs_cache()
+        self.assertIn(cache_key, lvm2cow._lvm_devices)
+        lvm2cow._invalidate_lvs_cache()
+        self.assertEqual(lvm2cow._lvm_devices, {})
+
+    def test__get_lv_dict(self):
+        lvm2thin = lvm2.Lvm2Thin(log, ConfigParser())
+        lv_dict = lvm2thin._get_lv_dict("fedora", "srv")
+        self.assertEqual(lv_dict["pool_lv"], "pool0")
+        self.assertIn("fedora/srv", lvm2thin._lvs_cache)
+        with self.assertRaises(SnapmCalloutError):
+            lvm2thin._get_lv_dict("some", "lv")
+
+    def test__check_lvm_name(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        max_len = lvm2cow.max_name_len
+        # Short names and names exactly at the limit are accepted.
+        lvm2cow._check_lvm_name("fedora", "root")
+        lvm2cow._check_lvm_name("vg", "l" * (max_len - len("vg/")))
+
+    def test__check_lvm_name_too_long_raises(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        max_len = lvm2cow.max_name_len
+        with self.assertRaises(SnapmInvalidIdentifierError):
+            lvm2cow._check_lvm_name("vg", "l" * (max_len - len("vg/") + 1))
+        with self.assertRaises(SnapmInvalidIdentifierError):
+            lvm2cow._check_lvm_name("v" * max_len, "lv")
+
+    def test__check_lvm_name_invalid_raises(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        for lv_name in ("", ".", "..", "-root", "root:snap", "root snap", "root/snap"):
+            with self.subTest(lv_name=lv_name):
+                with self.assertRaises(SnapmInvalidIdentifierError):
+                    lvm2cow._check_lvm_name("fedora", lv_name)
+
+    def test__check_lvm_name_reserved_raises(self):
+        lvm2cow = lvm2.Lvm2Cow(log, ConfigParser())
+        names = (
+            "snapshot0",
+            "pvmove0",
+            "root-snapset_backup_1693921253_-var-_mlog",
+            "data_tmeta-snapset_backup_1693921253_-data",
+        )
+        for lv_name in names:
+            with self.subTest(lv_name=lv_name):
+                with self.assertRaises(SnapmInvalidIdentifierError):
+                    lvm2cow._check_lvm_name("fedora", lv_name)
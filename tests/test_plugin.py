@@ -81,10 +81,27 @@ class PluginTests(unittest.TestCase):
             "somesnapshot": "some",
             "some_snapshot": "some",
             "root-notsnapset_backup_1693921253_-": "root",
+            "root-snapset_backup_notatime_-": "root",
+            "root-snapset_backup__-": "root",
+            "root-snapset_backup_1693921253_-data.2": "root",
         }
         for name, origin in snapshot_names.items():
             self.assertEqual(None, plugins.parse_snapshot_name(name, origin))
 
+    def test_encode_decode_mount_point(self):
+        mount_points = {
+            "/": "-",
+            "/data": "-data",
+            "/data-storage": "-data--storage",
+            "/data.storage": "-data..storage",
+            "/data:storage": "-data.3astorage",
+            "/data storage": "-data.20storage",
+        }
+        for mount_point, encoded in mount_points.items():
+            with self.subTest(mount_point=mount_point):
+                self.assertEqual(plugins.encode_mount_point(mount_point), encoded)
+                self.assertEqual(plugins.decode_mount_point(encoded), mount_point)
+
     @unittest.skipIf(in_rh_ci(), "Tests running in RH CI pipeline")
     def test_device_from_mount_point(self):
         mounts = _find_device_mounts()
@@ -93,8 +110,8 @@ class PluginTests(unittest.TestCase):
             self.assertTrue(dev.startswith("/dev"))
 
     def test_device_from_mount_point_bad_mount(self):
-        with self.assertRaises(KeyError) as cm:
-            dev = plugins.device_from_mount_point("/quuxfoo")
+        with self.assertRaises(KeyError):
+            plugins.device_from_mount_point("/quuxfoo")
 
     def test_mount_point_space_used(self):
         used = plugins.mount_point_space_used("/sys")